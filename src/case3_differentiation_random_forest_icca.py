@@ -13,14 +13,11 @@ if __name__ == "__main__":
     rfBFE_score = 0
     training_set_list = generate_training_sets_asynchronous(initial_state)
     genes = list(Genes.__members__.keys())
-    df = pd.DataFrame()
-    for g, ts in enumerate(training_set_list):
-        print('Target: ', Genes(g))
-        X, y = ts
-        rf = random_forest_classification(X, y)
+    # random forests of all the targets are trained together in parallel
+    df = screen_regulators(training_set_list, genes)
+    for gene in genes:
+        print('Target: ', gene)
         print('Feature importance:')
-        imp = obtain_feature_importances(rf, genes)
-        print(imp)
+        print(df[gene].sort_values(ascending=False))
         print('-----------------------------')
-        df[Genes(g).name] = imp
     df.to_csv('importance_data.csv')
@@ -1,6 +1,17 @@
+import hashlib
+import os
+import warnings
+import joblib
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from sklearn import tree
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import GridSearchCV
+from sim import compact_training_set, majority_labels
+
+# default directory of the on-disk cache of fitted screening models
+SCREENING_CACHE_DIR = 'screening_cache'
 
 
 def random_forest_classification(x_train, y_train):
@@ -26,4 +37,132 @@ def obtain_feature_importances(random_forest, features):
     Get the feature importance generated by a trained random forest regressor.
     Return: a pandas.Series containing the importance for each feature
     """
-    return pd.Series(random_forest.feature_importances_, index=features).sort_values(ascending=False)
\ No newline at end of file
+    return pd.Series(random_forest.feature_importances_, index=features).sort_values(ascending=False)
+
+
+def _fingerprint(X, y, *settings):
+    """
+    Hash a training set together with the model settings, used as the key of the model cache.
+    """
+    h = hashlib.sha1()
+    for a in (X, y):
+        a = np.ascontiguousarray(a)
+        h.update(str((a.shape, a.dtype.str)).encode())
+        h.update(a.tobytes())
+    h.update(repr(settings).encode())
+    return h.hexdigest()
+
+
+def _grow_random_forest(X, y, n_estimators, max_depth, random_state):
+    """
+    Grow a random forest with warm start on the weighted distinct samples of (X, y). The forest is enlarged through
+    the sizes in n_estimators and the size with the best out-of-bag accuracy is kept.
+    :return: the trained random forest
+    """
+    patterns, count_0, count_1 = compact_training_set(X, y)
+    # each (pattern, label) pair becomes one sample weighted by its number of occurrences
+    X_w = np.vstack((patterns, patterns))
+    y_w = np.concatenate((np.zeros(len(patterns), dtype=int), np.ones(len(patterns), dtype=int)))
+    w = np.concatenate((count_0, count_1))
+    X_w, y_w, w = X_w[w > 0], y_w[w > 0], w[w > 0]
+
+    rf = RandomForestClassifier(max_depth=max_depth, min_samples_split=2, warm_start=True, oob_score=True,
+                                random_state=random_state)
+    best_score = -1
+    best_n = None
+    best_decision = None
+    with warnings.catch_warnings():
+        # small forests leave some samples without OOB predictions, which _weighted_oob_score skips
+        warnings.filterwarnings('ignore', message='Some inputs do not have OOB scores', category=UserWarning)
+        for n in sorted(set(n_estimators)):
+            rf.set_params(n_estimators=n)
+            rf.fit(X_w, y_w, sample_weight=w)   # only the new n - len(rf.estimators_) trees are trained
+            score = _weighted_oob_score(rf, y_w, w)
+            if score > best_score:
+                best_score = score
+                best_n = n
+                best_decision = rf.oob_decision_function_
+    # keep the first best_n trees, i.e., exactly the forest that was scored
+    rf.estimators_ = rf.estimators_[:best_n]
+    rf.set_params(n_estimators=best_n, warm_start=False)
+    rf.oob_decision_function_ = best_decision
+    rf.oob_score_ = best_score
+    return rf
+
+
+def _weighted_oob_score(rf, y, w):
+    """
+    Out-of-bag accuracy of a random forest where each sample counts by its weight. Samples that are never out of bag
+    are ignored.
+    :return: the weighted out-of-bag accuracy
+    """
+    decision = rf.oob_decision_function_
+    valid = ~np.isnan(decision).any(axis=1) & (decision.sum(axis=1) > 0)
+    if not np.any(valid):
+        return 0
+    correct = rf.classes_[np.argmax(decision[valid], axis=1)] == y[valid]
+    return np.sum(w[valid] * correct) / np.sum(w[valid])
+
+
+def _fit_decision_tree(X, y, random_state):
+    """
+    Fit a decision tree on the weighted distinct input patterns of (X, y). Conflicting labels of a pattern are
+    resolved by majority (ties go to 1).
+    :return: the trained decision tree
+    """
+    patterns, count_0, count_1 = compact_training_set(X, y)
+    labels = majority_labels(count_0, count_1)
+    clf = tree.DecisionTreeClassifier(random_state=random_state)
+    return clf.fit(patterns, labels, sample_weight=count_0 + count_1)
+
+
+def screen_regulators(training_set_list, features, method='random_forest', n_estimators=(10, 20, 30, 50),
+                      max_depth=3, n_jobs=-1, random_state=None, cache_dir=SCREENING_CACHE_DIR):
+    """
+    Coarse selection of the potential regulators for all the target genes at once. The models of all targets are
+    trained in one parallel job and fitted models are cached on disk, so a training set that has been screened before
+    with the same settings is not trained again.
+    :param training_set_list: a list of n training sets for the n genes, each set in form (X, y)
+    :param features: the names of the n genes, i.e., of the columns of X
+    :param method: 'random_forest' or 'decision_tree'
+    :param n_estimators: candidate forest sizes, grown with warm start and chosen by weighted out-of-bag accuracy
+    :param max_depth: maximum depth of each tree in the forest
+    :param n_jobs: number of parallel jobs, -1 means using all processors
+    :param random_state: seed passed to the models
+    :param cache_dir: directory of the model cache, None to disable caching
+    :return: a pandas.DataFrame whose column for each target holds the importance of each feature
+    """
+    if method == 'random_forest':
+        settings = (method, tuple(sorted(set(n_estimators))), max_depth, random_state)
+    elif method == 'decision_tree':
+        settings = (method, random_state)
+    else:
+        raise ValueError("Unknown screening method: {0}".format(method))
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    keys = [_fingerprint(X, y, *settings) for X, y in training_set_list]
+    models = {}
+    missing = {}    # identical training sets are trained only once
+    for key, training_set in zip(keys, training_set_list):
+        if key in models or key in missing:
+            continue
+        path = None if cache_dir is None else os.path.join(cache_dir, key + '.joblib')
+        if path is not None and os.path.exists(path):
+            models[key] = joblib.load(path)
+        else:
+            missing[key] = training_set
+    if method == 'random_forest':
+        fitted = Parallel(n_jobs=n_jobs)(delayed(_grow_random_forest)(X, y, n_estimators, max_depth, random_state)
+                                         for X, y in missing.values())
+    else:
+        fitted = Parallel(n_jobs=n_jobs)(delayed(_fit_decision_tree)(X, y, random_state) for X, y in missing.values())
+    for key, model in zip(missing, fitted):
+        models[key] = model
+        if cache_dir is not None:
+            joblib.dump(model, os.path.join(cache_dir, key + '.joblib'))
+
+    df = pd.DataFrame(index=features)
+    for target, key in zip(features, keys):
+        df[target] = pd.Series(models[key].feature_importances_, index=features)
+    return df
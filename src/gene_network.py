@@ -154,3 +154,20 @@ def update(s, gene = None):
         for g in Genes:
             new_s[g] = _update_rules[g](s)[g]
         return new_s
+
+
+# Vectorized counterparts of the update rules above, used by the batch simulator in sim.py. Each rule takes a 2d
+# boolean array with one network state per row and returns the new state of its gene for every row.
+batch_update_rules = [
+    lambda S: S[:, Genes.GATA2] & ~(S[:, Genes.GATA1] & S[:, Genes.FOG1]) & ~S[:, Genes.PU1],
+    lambda S: (S[:, Genes.GATA1] | S[:, Genes.GATA2] | S[:, Genes.Fli1]) & ~S[:, Genes.PU1],
+    lambda S: S[:, Genes.GATA1],
+    lambda S: S[:, Genes.GATA1] & ~S[:, Genes.Fli1],
+    lambda S: S[:, Genes.GATA1] & ~S[:, Genes.EKLF],
+    lambda S: S[:, Genes.GATA1] & ~S[:, Genes.PU1],
+    lambda S: S[:, Genes.CEBPa] & ~(S[:, Genes.GATA1] & S[:, Genes.FOG1] & S[:, Genes.SCL]),
+    lambda S: (S[:, Genes.CEBPa] | S[:, Genes.PU1]) & ~(S[:, Genes.GATA1] | S[:, Genes.GATA2]),
+    lambda S: S[:, Genes.PU1] & ~S[:, Genes.Gfi1],
+    lambda S: (S[:, Genes.PU1] & S[:, Genes.cJun]) & ~S[:, Genes.Gfi1],
+    lambda S: S[:, Genes.CEBPa] & ~S[:, Genes.EgrNab],
+]
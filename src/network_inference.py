@@ -9,7 +9,7 @@ import itertools
 from sklearn import tree
 import numpy as np
 from gene_network import Genes
-from sim import state_to_index
+from sim import state_to_index, states_to_indices, compact_training_sets, majority_labels
 
 
 def _entropy(X: np.ndarray):
@@ -27,6 +27,37 @@ def _entropy(X: np.ndarray):
     return -(p * np.log(p)).sum()
 
 
+def mutual_information_matrix(patterns, count_0, count_1):
+    """
+    Compute the mutual information between the state of each gene and the output of each target gene, for all the
+    (regulator, target) pairs in one matrix pass. It is a cheap screening statistic for large networks. All the targets
+    must share the same inputs, i.e., count_0 + count_1 is identical for every column.
+    :param patterns: distinct network states in 2d array of shape (p, n) (see sim.compact_training_sets)
+    :param count_0: 2d array of shape (p, n), element (i, g) is the number of times target g outputs 0 at patterns[i]
+    :param count_1: 2d array of shape (p, n), element (i, g) is the number of times target g outputs 1 at patterns[i]
+    :return: an n-by-n matrix, whose element (i, g) is the mutual information between gene i and the output of gene g
+    """
+    X = np.asarray(patterns, dtype=float)
+    count_1 = np.asarray(count_1, dtype=float)
+    totals = np.asarray(count_0, dtype=float) + count_1
+    total = totals[:, 0]   # occurrences of each pattern
+    if not np.all(totals == total[:, np.newaxis]):
+        raise ValueError("All the targets should share the same input samples")
+    m = total.sum()
+    x1 = (X.T @ total)[:, np.newaxis]     # number of samples with gene i being 1
+    y1 = count_1.sum(axis=0)[np.newaxis, :]     # number of samples with target g outputting 1
+    n11 = X.T @ count_1
+    n10 = x1 - n11
+    n01 = y1 - n11
+    n00 = m - n11 - n10 - n01
+    mi = np.zeros_like(n11)
+    for n_xy, n_x, n_y in ((n11, x1, y1), (n10, x1, m - y1), (n01, m - x1, y1), (n00, m - x1, m - y1)):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            term = n_xy / m * np.log(n_xy * m / (n_x * n_y))
+        mi += np.where(n_xy > 0, term, 0)
+    return mi
+
+
 def _removeInconsistency(X, y):
     """
     Choose an identical label for each input pattern such that the training set can have an extension
@@ -49,6 +80,16 @@ def _removeInconsistency(X, y):
             y[i] = 0
 
 
+def _removeInconsistency_weighted(count_0, count_1):
+    """
+    Weighted version of _removeInconsistency on a compacted training set (see sim.compact_training_set).
+    :param count_0: number of times each distinct input pattern is labelled 0
+    :param count_1: number of times each distinct input pattern is labelled 1
+    :return: the consistent label of each distinct input pattern, chosen by majority (1 for ties)
+    """
+    return majority_labels(count_0, count_1)
+
+
 def reveal(X, y):
     """
     REVEAL algorithm, infer the regulators for a gene given the training set
@@ -68,17 +109,41 @@ def reveal(X, y):
     return None
 
 
-def best_fit(X, y, candidate_genes=Genes):
+def reveal_weighted(patterns, count_0, count_1):
+    """
+    REVEAL algorithm on a compacted training set (see sim.compact_training_set), whose cost scales with the number
+    of distinct input patterns.
+    :param patterns: distinct input patterns in 2d array, where each row represents a network state
+    :param count_0: number of times each pattern is labelled 0
+    :param count_1: number of times each pattern is labelled 1
+    :return: a list containing the regulators, or None if no matching regulators found
+    """
+    y = _removeInconsistency_weighted(count_0, count_1)
+    for k in range(1, len(Genes) + 1):
+        for c in itertools.combinations(Genes, k):
+            # y is determined by the genes c iff no sub-pattern of c is mapped to both 0 and 1
+            index = states_to_indices(patterns[:, c])
+            has_0 = np.bincount(index, weights=1 - y, minlength=2 ** k)
+            has_1 = np.bincount(index, weights=y, minlength=2 ** k)
+            if not np.any((has_0 > 0) & (has_1 > 0)):
+                return set(c)
+    return None
+
+
+def best_fit(X, y, candidate_genes=Genes, max_k=None):
     """
     Best-fit extension algorithm, infer the regulators for a gene given the training set
     :param X: input in 2d array, where each row represents a network state
     :param y: output in a vector, where each element means the state of a gene
     :param candidate_genes: the candidates for regulator test
+    :param max_k: maximum number of regulators to test, None for no limit
     :return: a list containing the regulators
     """
     min_error = len(y) + 1
     min_c = None    # the regulator list corresponding to the minimum classification error
-    for k in range(1, len(candidate_genes) + 1):
+    if max_k is None:
+        max_k = len(candidate_genes)
+    for k in range(1, min(max_k, len(candidate_genes)) + 1):
         for c in itertools.combinations(candidate_genes, k):
             count_0 = [0] * (2 ** k)
             count_1 = [0] * (2 ** k)
@@ -105,6 +170,53 @@ def best_fit(X, y, candidate_genes=Genes):
     return set(min_c)
 
 
+def best_fit_weighted(patterns, count_0, count_1, candidate_genes=Genes, max_k=None):
+    """
+    Best-fit extension algorithm on a compacted training set (see sim.compact_training_set), where each distinct
+    input pattern is weighted by its label counts.
+    :param patterns: distinct input patterns in 2d array, where each row represents a network state
+    :param count_0: number of times each pattern is labelled 0
+    :param count_1: number of times each pattern is labelled 1
+    :param candidate_genes: the candidates for regulator test
+    :param max_k: maximum number of regulators to test, None for no limit
+    :return: a list containing the regulators
+    """
+    min_error = np.sum(count_0) + np.sum(count_1) + 1
+    min_c = None
+    if max_k is None:
+        max_k = len(candidate_genes)
+    for k in range(1, min(max_k, len(candidate_genes)) + 1):
+        for c in itertools.combinations(candidate_genes, k):
+            index = states_to_indices(patterns[:, c])
+            c_0 = np.bincount(index, weights=count_0, minlength=2 ** k)
+            c_1 = np.bincount(index, weights=count_1, minlength=2 ** k)
+            # the minority label of each input of c is misclassified
+            error = np.minimum(c_0, c_1).sum()
+            if error < min_error:
+                min_error = error
+                min_c = c
+            if min_error == 0:
+                return set(min_c)
+    return set(min_c)
+
+
+def _select_by_importance(feature_importances, importance_threshold=0):
+    """
+    Select the regulators whose feature importance exceeds the threshold
+    :param feature_importances: the importance of each gene given by a trained decision tree
+    :param importance_threshold: genes with importance larger than this value are chosen
+    :return: a set containing the regulators
+    """
+    index_array = np.argsort(feature_importances)[::-1]     # sort in descending order
+    c = []
+    for index in index_array:
+        if feature_importances[index] > importance_threshold:
+            c.append(Genes(index))
+        else:
+            break
+    return set(c)
+
+
 def decision_tree_infer(X, y, importance_threshold=0):
     """
     Decision tree for Boolean network inference (DTBNI), infer the regulators for a gene given the training set 
@@ -117,16 +229,43 @@ def decision_tree_infer(X, y, importance_threshold=0):
     _removeInconsistency(X, y)
     clf = tree.DecisionTreeClassifier()
     clf = clf.fit(X, y)
-    feature_importances = clf.feature_importances_
-    index_array = np.argsort(feature_importances)[::-1]     # sort in descending order
-    c = []
-    for index in index_array:
-        if feature_importances[index] > 0:
-            c.append(Genes(index))
-        else:
-            break
-    return set(c)
+    return _select_by_importance(clf.feature_importances_, importance_threshold)
 
 
+def decision_tree_infer_weighted(patterns, count_0, count_1, importance_threshold=0):
+    """
+    DTBNI on a compacted training set (see sim.compact_training_set), where each distinct input pattern is used once
+    with its number of occurrences as sample weight.
+    :param patterns: distinct input patterns in 2d array, where each row represents a network state
+    :param count_0: number of times each pattern is labelled 0
+    :param count_1: number of times each pattern is labelled 1
+    :param importance_threshold: critetiorn for the regulator selection. 0: choose the ones with non-zero importance.
+    :return: a list containing the regulators
+    """
+    y = _removeInconsistency_weighted(count_0, count_1)
+    clf = tree.DecisionTreeClassifier()
+    clf = clf.fit(patterns, y, sample_weight=np.asarray(count_0) + np.asarray(count_1))
+    return _select_by_importance(clf.feature_importances_, importance_threshold)
 
 
+def infer_network_approx(X, Y, shortlist_size=10, *, max_k=3):
+    """
+    Approximate inference for large networks. For each target, the genes with the largest mutual information with its
+    output are shortlisted and Best-fit extension with at most max_k regulators is run on the shortlist only.
+    shortlist_size is the knob that trades accuracy for speed: the cost of Best-fit for one target grows as
+    C(shortlist_size, max_k), independent of the network size, while max_k is a fixed bound on the regulator count.
+    Regulators without marginal information on the target (e.g., XOR-type inputs) are only found when the shortlist
+    is large enough to include them.
+    :param X: input in 2d array, where each row represents a network state
+    :param Y: output in 2d array of the same shape, column g is the output of gene g (see sim.stream_training_samples)
+    :param shortlist_size: number of candidate regulators kept for each target
+    :param max_k: maximum number of regulators of each target (keyword only, usually left as is)
+    :return: a list containing the regulators of each gene
+    """
+    patterns, count_0, count_1 = compact_training_sets(X, Y)
+    mi = mutual_information_matrix(patterns, count_0, count_1)
+    regulators = []
+    for g in range(patterns.shape[1]):
+        shortlist = np.argsort(mi[:, g])[::-1][:shortlist_size].tolist()    # in descending order of information
+        regulators.append(best_fit_weighted(patterns, count_0[:, g], count_1[:, g], shortlist, max_k))
+    return regulators
@@ -17,11 +17,23 @@ def random_sampling(training_set_list, q):
     return sampled_training_set_list
 
 
-def random_test_without_noise():
+def _get_methods(compacted):
+    """
+    The three inference methods, each called with a training set in form (X, y)
+    :param compacted: if True, the training set is compacted first and the weighted variants are used
+    :return: a list of the three methods
+    """
+    if not compacted:
+        return [reveal, best_fit, decision_tree_infer]
+    return [lambda X, y, method=method: method(*compact_training_set(X, y))
+            for method in (reveal_weighted, best_fit_weighted, decision_tree_infer_weighted)]
+
+
+def random_test_without_noise(compacted=False):
     q_list = [5, 10, 20, 40, 80, 160, 320]
     num_repetitions = 100
     counts = np.empty((len(q_list), num_repetitions, 3), dtype=int)  # count the number of genes that has been inferred
-    methods = [reveal, best_fit, decision_tree_infer]
+    methods = _get_methods(compacted)
     complete_training_set_list = generate_complete_training_set()
     for j, q in enumerate(q_list):
         print("Now processing q = ", q)
@@ -51,16 +63,17 @@ def add_noise(training_set_list, probability=0.1):
         y[random_filter] = 1 - y[random_filter]
 
 
-def random_test_with_noise(probability=0.1):
+def random_test_with_noise(probability=0.1, compacted=False):
     """
     Random sampling of the complete training set (the whole state space) and add noise, then infer the regulators.
     :param probability: the probability for flipping the output to mimic noise effect
+    :param compacted: if True, duplicated samples are collapsed and the weighted variants of the methods are used
     :return: void
     """
     q_list = [5, 10, 20, 50, 100, 300, 500]
     num_repetitions = 100
     counts = np.empty((len(q_list), num_repetitions, 3), dtype=int)  # count the number of genes that has been inferred
-    methods = [reveal, best_fit, decision_tree_infer]
+    methods = _get_methods(compacted)
     complete_training_set_list = generate_complete_training_set()
     for j, q in enumerate(q_list):
         print("Now processing q = ", q)
@@ -2,6 +2,7 @@
 Simulate the network under various circumstances to generate data.
 """
 
+import os
 from gene_network import *
 
 
@@ -19,6 +20,17 @@ def state_to_index(s):
     return index
 
 
+def states_to_indices(S):
+    """
+    Vectorized version of state_to_index for a batch of states (at most 63 genes).
+    :param S: 2d array, where each row is a state
+    :return: a vector containing the index representation of each state
+    """
+    S = np.asarray(S, dtype=np.int64)
+    n = S.shape[1]
+    return S @ (np.int64(1) << np.arange(n - 1, -1, -1, dtype=np.int64))
+
+
 def index_to_state(index):
     """
     Given an index integer, explain its binary representation (MSB first) as a network state
@@ -112,6 +124,47 @@ def generate_complete_training_set():
     return n_training_set
 
 
+def compact_training_set(X, y):
+    """
+    Collapse a training set into its distinct input patterns. Repeated samples, which are common after random 
+    sampling or in asynchronous simulation, are then represented by counts instead of duplicated rows.
+    :param X: input in 2d array, where each row represents a network state
+    :param y: output in a vector, where each element means the state of a gene
+    :return: (patterns, count_0, count_1), where patterns holds the distinct rows of X and count_0 (count_1) is the
+    number of times each pattern is labelled 0 (1)
+    """
+    patterns, count_0, count_1 = compact_training_sets(X, np.reshape(y, (-1, 1)))
+    return patterns, count_0[:, 0], count_1[:, 0]
+
+
+def compact_training_sets(X, Y):
+    """
+    Compact the training sets of all the genes at once, which share the same input X (see compact_training_set).
+    :param X: input in 2d array, where each row represents a network state
+    :param Y: output in 2d array with one row per sample, where column g is the output of gene g
+    :return: (patterns, count_0, count_1), where patterns holds the distinct rows of X and element (i, g) of count_0 
+    (count_1) is the number of times gene g outputs 0 (1) at patterns[i]
+    """
+    patterns, inverse = np.unique(X, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    count_1 = np.empty((len(patterns), Y.shape[1]), dtype=int)
+    for g in range(Y.shape[1]):
+        count_1[:, g] = np.bincount(inverse, weights=Y[:, g], minlength=len(patterns))
+    count_0 = np.bincount(inverse, minlength=len(patterns))[:, np.newaxis] - count_1
+    return patterns, count_0, count_1
+
+
+def majority_labels(count_0, count_1):
+    """
+    Choose an identical label for each input pattern of a compacted training set (see compact_training_set), such
+    that the training set can have an extension.
+    :param count_0: number of times each distinct input pattern is labelled 0
+    :param count_1: number of times each distinct input pattern is labelled 1
+    :return: the label of each distinct input pattern, chosen by majority (1 for ties)
+    """
+    return (np.asarray(count_1) >= np.asarray(count_0)).astype(int)
+
+
 
 def generate_synchronous_trajectory(initial_state):
     """
@@ -192,6 +245,135 @@ def generate_training_sets_asynchronous(initial_state):
     return training_sets
 
 
+def random_boolean_network(n, k, seed=None):
+    """
+    Generate a random Boolean network of n genes (Kauffman NK model), where each gene has k regulators chosen at
+    random and a random truth table. It is used to produce benchmarks for networks too large to be enumerated.
+    :param n: number of genes
+    :param k: number of regulators of each gene
+    :param seed: seed of the random number generator
+    :return: (rules, regulators), where rules is a list of n vectorized update rules (see
+    gene_network.batch_update_rules) and regulators[g] is the set of regulators of gene g
+    """
+    rng = np.random.default_rng(seed)
+    rules = []
+    regulators = []
+    for g in range(n):
+        regs = rng.choice(n, k, replace=False)
+        table = rng.integers(0, 2, 2 ** k).astype(bool)
+        rules.append(lambda S, regs=regs, table=table: table[states_to_indices(S[:, regs])])
+        regulators.append(set(regs.tolist()))
+    return rules, regulators
+
+
+def stream_training_samples(rules, n_walkers, n_steps, synchronous=False, initial_states=None, sample_budget=None,
+                            seed=None):
+    """
+    Simulate a batch of independent walkers in parallel for a fixed number of steps, without enumerating the 2^n 
+    states. At each step, the walkers' states X and the output Y of every gene's rule on X are yielded, so the 
+    training set of gene g is formed by the rows (X, Y[:, g]). Then each walker moves on, either synchronously or by 
+    updating one randomly chosen gene (random asynchronous). The walkers are kept in a boolean array with one column
+    per gene, since the rules read the genes column-wise; states are bit-packed only on disk (see
+    write_training_chunks).
+    :param rules: vectorized update rules, one per gene (see gene_network.batch_update_rules)
+    :param n_walkers: number of walkers simulated together
+    :param n_steps: number of simulation steps
+    :param synchronous: True for the synchronous scheme, False for random asynchronous updating
+    :param initial_states: 2d array of shape (n_walkers, n) with the initial states, random if None
+    :param sample_budget: stop once this number of samples has been produced, unlimited if None
+    :param seed: seed of the random number generator
+    :return: a generator of (X, Y), two boolean arrays of shape (m, n) with m <= n_walkers
+    """
+    rng = np.random.default_rng(seed)
+    n = len(rules)
+    if initial_states is None:
+        S = rng.integers(0, 2, (n_walkers, n)).astype(bool)
+    else:
+        S = np.array(initial_states, dtype=bool)
+        if S.shape != (n_walkers, n):
+            raise ValueError("initial_states should have shape {0}, got {1}".format((n_walkers, n), S.shape))
+    if sample_budget is not None and sample_budget <= 0:
+        raise ValueError("sample_budget should be positive, got {0}".format(sample_budget))
+    # the arguments are checked on the call, while the simulation itself runs lazily
+    return _walk(rules, S, n_steps, synchronous, sample_budget, rng)
+
+
+def _walk(rules, S, n_steps, synchronous, sample_budget, rng):
+    """
+    The generator behind stream_training_samples.
+    """
+    n = len(rules)
+    rows = np.arange(len(S))
+    produced = 0
+    for _ in range(n_steps):
+        Y = np.empty_like(S)
+        for g, rule in enumerate(rules):
+            Y[:, g] = rule(S)
+        if sample_budget is not None and produced + len(S) >= sample_budget:
+            m = sample_budget - produced
+            yield S[:m], Y[:m]
+            return
+        yield S, Y
+        produced += len(S)
+        if synchronous:
+            S = Y
+        else:
+            S = S.copy()
+            genes = rng.integers(0, n, len(S))  # the gene updated by each walker
+            S[rows, genes] = Y[rows, genes]
+
+
+def write_training_chunks(stream, directory, chunk_size=1000000):
+    """
+    Save the samples of a stream (see stream_training_samples) to disk in chunks of bit-packed states, such that only
+    one chunk is kept in memory.
+    :param stream: an iterable of (X, Y) sample batches
+    :param directory: directory to store the chunk files, created if not existing
+    :param chunk_size: maximum number of samples in each chunk
+    :return: a list of the paths of the written chunk files
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size should be positive, got {0}".format(chunk_size))
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    buffer_X, buffer_Y, size = [], [], 0
+
+    def flush():
+        X = np.concatenate(buffer_X)
+        Y = np.concatenate(buffer_Y)
+        path = os.path.join(directory, 'chunk_{0:05d}.npz'.format(len(paths)))
+        np.savez(path, n=X.shape[1], X=np.packbits(X, axis=1), Y=np.packbits(Y, axis=1))
+        paths.append(path)
+
+    for X, Y in stream:
+        while len(X) > 0:
+            m = min(chunk_size - size, len(X))
+            buffer_X.append(X[:m])
+            buffer_Y.append(Y[:m])
+            size += m
+            X, Y = X[m:], Y[m:]
+            if size == chunk_size:
+                flush()
+                buffer_X, buffer_Y, size = [], [], 0
+    if size > 0:
+        flush()
+    return paths
+
+
+def read_training_chunk(path, g):
+    """
+    Load the training set of gene g from a chunk file written by write_training_chunks.
+    :param path: path of the chunk file
+    :param g: a gene index
+    :return: the training set (X, y), where X is a 2d array input and y is an output vector
+    """
+    with np.load(path) as data:
+        n = int(data['n'])
+        X = np.unpackbits(data['X'], axis=1, count=n).astype(int)
+        y = np.unpackbits(data['Y'], axis=1, count=n)[:, g].astype(int)
+    return X, y
+
+
 if __name__ == '__main__':
     # generate the data states from a given initial state for the myeloid network
     initial_state = np.array([1, 0, 0, 0, 0, 0, 1, 1, 0, 0, 0])
@@ -25,8 +25,25 @@ def test_decision_tree(training_set):
         c = decision_tree_infer(*ts, importance_threshold=0)
 
 
+def test_reveal_compacted(training_set):
+    for ts in training_set:
+        c = reveal_weighted(*compact_training_set(*ts))
+
+
+def test_best_fit_compacted(training_set):
+    for ts in training_set:
+        c = best_fit_weighted(*compact_training_set(*ts))
+
+
+def test_decision_tree_compacted(training_set):
+    for ts in training_set:
+        c = decision_tree_infer_weighted(*compact_training_set(*ts), importance_threshold=0)
+
+
 if __name__ == "__main__":
-    methods = {"reveal": test_reveal, "BFE": test_best_fit, "rfBFE": test_decision_tree}
+    methods = {"reveal": test_reveal, "BFE": test_best_fit, "rfBFE": test_decision_tree,
+               "reveal (compacted)": test_reveal_compacted, "BFE (compacted)": test_best_fit_compacted,
+               "rfBFE (compacted)": test_decision_tree_compacted}
     for m in methods.keys():
         print(f"- Running {m}")
         ts = timer()